@@ -0,0 +1,173 @@
+"""
+Shared HITRAN .par line list helpers for the cross-correlation and feature-tracking modules:
+a cached reader, per-molecule grouping and clustering of each molecule's strongest lines.
+"""
+
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+# Only the fields used downstream: molecule id, wavenumber and line intensity
+_PAR_COLSPECS = [(0, 2), (3, 15), (15, 25)]
+_PAR_NAMES = ['molec_id', 'nu', 'sw']
+_PAR_INT_COLUMNS = ('molec_id',)
+
+
+def _parse_par_records(path):
+    """
+    Parse a .par file laid out as equal-length records by slicing the raw bytes column-wise.
+
+    Returns None when the file does not fit that layout (comments, blank or ragged lines,
+    non-numeric fields), in which case the caller falls back to `pandas.read_fwf`.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    newlines = np.flatnonzero(buf[:4096] == ord('\n'))
+    if newlines.size == 0:
+        return None
+    rec_len = int(newlines[0]) + 1
+    if rec_len <= max(stop for _, stop in _PAR_COLSPECS) or buf.size % rec_len:
+        return None
+    records = buf.reshape(-1, rec_len)
+    if not (records[:, -1] == ord('\n')).all():
+        return None
+
+    columns = {}
+    try:
+        for name, (start, stop) in zip(_PAR_NAMES, _PAR_COLSPECS):
+            field = np.ascontiguousarray(records[:, start:stop]).view(f'S{stop - start}').ravel()
+            columns[name] = field.astype(np.int64 if name in _PAR_INT_COLUMNS else np.float64)
+    except ValueError:
+        return None
+    return pd.DataFrame(columns)
+
+
+@lru_cache(maxsize=4)
+def _read_par_cached(path, mtime_ns):
+    """
+    Parse a HITRAN .par file, reusing a .parquet sidecar written next to it when it is up to date.
+
+    `mtime_ns` is only used as part of the cache key, so editing the .par file forces a reparse.
+    """
+    p = Path(path)
+    pq = p.with_suffix('.parquet')
+    if pq.exists() and pq.stat().st_mtime_ns >= mtime_ns:
+        try:
+            df = pd.read_parquet(pq)
+        except (OSError, pa.ArrowException):
+            df = None  # Truncated or corrupt sidecar; reparse and overwrite it below
+        if df is not None and list(df.columns) == _PAR_NAMES:
+            return df
+
+    df = _parse_par_records(p)
+    if df is None:
+        df = pd.read_fwf(p, colspecs=_PAR_COLSPECS, names=_PAR_NAMES,
+                         comment='#', skip_blank_lines=True)
+    _write_sidecar(df, pq)
+    return df
+
+
+def _write_sidecar(df, pq):
+    """
+    Write `df` to the parquet sidecar `pq` atomically.
+
+    The table goes to a temporary file in the same directory first and is then renamed over
+    `pq`, so an interrupted run or a concurrent reader never sees a partial sidecar.
+    """
+    try:
+        fd, tmp = tempfile.mkstemp(dir=pq.parent, prefix=pq.name + '.', suffix='.tmp')
+    except OSError:
+        return  # Read-only data directory; keep the in-memory cache only
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            df.to_parquet(f)
+        os.replace(tmp, pq)
+    except OSError:
+        pass  # e.g. disk full; the in-memory cache still holds the table
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def load_linelist_par(path):
+    """
+    Load the molec_id, nu and sw columns of a HITRAN .par line list.
+
+    Parses are memoized per path and modification time and shared by every module that
+    imports this one, so the CCF and feature-tracking steps read the file only once.
+
+    Parameters
+    ----------
+    path : str
+        Path to the .par file.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A private copy of the parsed line list, safe for callers to modify.
+    """
+    return _read_par_cached(os.path.abspath(path), os.stat(path).st_mtime_ns).copy()
+
+
+def group_by_molecule(lines):
+    """
+    Partition a line list by molecule in a single groupby pass, instead of masking it once per molecule.
+
+    Parameters
+    ----------
+    lines : pandas.DataFrame
+        Line list with a 'molec_id' column.
+
+    Returns
+    -------
+    dict
+        Mapping of molec_id to the DataFrame of that molecule's lines.
+    """
+    return dict(list(lines.groupby('molec_id', sort=False)))
+
+
+def cluster_centers(wavelength, sw, wave, top_n, bin_width):
+    """
+    Cluster the strongest lines of a molecule into wavelength bins and return the bin centers.
+
+    Parameters
+    ----------
+    wavelength, sw : np.ndarray
+        Line wavelengths (microns) and intensities for a single molecule.
+    wave : np.ndarray
+        Wavelength grid of the spectrum, used to lay out the bins.
+    top_n : int
+        Number of strongest lines to keep.
+    bin_width : float
+        Width of the wavelength bins, in microns.
+
+    Returns
+    -------
+    np.ndarray
+        Mean wavelength of the strongest lines falling in each occupied bin, in ascending order.
+    """
+    # Select like dropna().nlargest(top_n, 'sw'): lines without an intensity are never
+    # picked, and ties at the cut-off keep the earliest lines
+    sw = np.asarray(sw, dtype=np.float64)
+    valid = ~np.isnan(sw)
+    w, sw = np.asarray(wavelength)[valid], sw[valid]
+    if top_n <= 0 or len(w) == 0:
+        return np.empty(0)
+    if len(sw) > top_n:
+        kth = np.partition(sw, len(sw) - top_n)[len(sw) - top_n]
+        above = np.flatnonzero(sw > kth)
+        ties = np.flatnonzero(sw == kth)[:top_n - len(above)]
+        w = w[np.concatenate([above, ties])]
+    w = np.sort(w)
+
+    # Bin ids are non-decreasing on sorted input, so each cluster is a contiguous run
+    bins = np.arange(wave.min(), wave.max() + bin_width, bin_width)
+    inds = np.digitize(w, bins)
+    edges = np.flatnonzero(np.r_[True, np.diff(inds) > 0])
+    sums = np.add.reduceat(w, edges)
+    counts = np.diff(np.r_[edges, len(w)])
+    return sums / counts
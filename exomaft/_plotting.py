@@ -0,0 +1,33 @@
+"""
+Shared plotting settings for the exomaft pipeline modules.
+"""
+
+import os
+import warnings
+
+DEFAULT_DPI = 120
+
+
+def savefig_dpi():
+    """
+    Resolution for saved PNG figures.
+
+    Read from the MAFT_DPI environment variable at call time, so a bad value cannot break
+    `import exomaft`; unset, non-integer or non-positive values fall back to DEFAULT_DPI.
+
+    Returns
+    -------
+    int
+        Dots per inch to pass to `savefig`.
+    """
+    value = os.environ.get('MAFT_DPI')
+    if value is None:
+        return DEFAULT_DPI
+    try:
+        dpi = int(value)
+    except ValueError:
+        dpi = 0
+    if dpi <= 0:
+        warnings.warn(f"Ignoring invalid MAFT_DPI={value!r}; using {DEFAULT_DPI}")
+        return DEFAULT_DPI
+    return dpi
@@ -1,4 +1,8 @@
+import logging
 import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 class Linelist:
     """
@@ -19,6 +23,8 @@ class Linelist:
         Path to the directory where cleaned and sorted files will be saved.
     outlines_master : str
         Path to the final merged line list file.
+    verbose : bool
+        If True, print per-file progress messages.
     """
 
     elem_dict = {
@@ -29,7 +35,7 @@ class Linelist:
         # "NH3": ...,
     }
 
-    def __init__(self, elem):
+    def __init__(self, elem, verbose=False):
         """
         Initialize the Linelist processor for a given element/molecule.
 
@@ -37,14 +43,18 @@ class Linelist:
         ----------
         elem : str
             The key from `elem_dict` representing the target species (e.g., "H20").
+        verbose : bool, optional
+            If True, print per-file progress messages. Default is False.
         """
         self.elem = elem
+        self.verbose = verbose
         self.lines_dir = "exomaft/data"
         self.outlines_dir = os.path.join(self.lines_dir, "outlines/")
         self.outlines_sorted_dir = os.path.join(self.lines_dir, "outlines_sorted/")
         self.outlines_master = os.path.join(self.lines_dir, "outlines_master.txt")
 
-        print(self.outlines_dir)
+        if self.verbose:
+            print(self.outlines_dir)
 
     def sortlines(self):
         """
@@ -57,49 +67,65 @@ class Linelist:
         - Sorts the cleaned data by wavelength.
         - Writes cleaned lines to new `_cleaned.txt` files in `outlines_sorted_dir`.
         """
+        if self.elem not in self.elem_dict:
+            print(f"No {self.elem} in wavelength range.")
+            return
+
         for filename in os.listdir(self.outlines_dir):
 
             if not filename.endswith(".txt"):
                 continue
 
             file_path = os.path.join(self.outlines_dir, filename)
-            print(file_path)
-
-            clean_rows = []
-
-            with open(file_path, "r", encoding="ascii") as f:
-                lines = f.readlines()
+            if self.verbose:
+                print(file_path)
+
+            # Keep energy and log(gf) as their original strings so they round-trip unchanged
+            try:
+                table = np.loadtxt(file_path, dtype=str, skiprows=1, usecols=(0, 1, 2, 3),
+                                   ndmin=2, encoding="ascii")
+                wave = np.abs(table[:, 0].astype(np.float64))   # Wavelength
+                code = table[:, 1].astype(np.float64)           # Atomic/molecular number
+            except ValueError as e:
+                logger.warning("ERROR parsing %s: %s", file_path, e)
+                raise
+
+            order = self._filter_sort(wave, code, table[:, 2], table[:, 3],
+                                      self.elem_dict[self.elem])
 
-                for line in lines[1:]:  # skip header
-                    columns = line.strip().split()
-
-                    try:
-                        col1 = abs(float(columns[0]))   # Wavelength
-                        col2 = float(columns[1])        # Atomic/molecular number
-                        col3 = columns[2]               # Energy (eV)
-                        col4 = columns[3]               # log(gf)
-                    except Exception as e:
-                        print(f"ERROR parsing line: {repr(line)}")
-                        print(f"Exception: {e}")
-                        raise
+            cleaned_filename = filename.replace(".txt", "") + "_cleaned.txt"
 
-                    try:
-                        if str(col2).startswith(str(self.elem_dict[self.elem])):
-                            print(f"{self.elem} line at {col1}")
-                            clean_rows.append((col1, col2, col3, col4))
-                    except:
-                        print(f"No {self.elem} in wavelength range.")
-                        return
+            with open(os.path.join(self.outlines_sorted_dir, cleaned_filename), "w") as f:
+                for i in order:
+                    f.write(f"{wave[i]} {code[i]} {table[i, 2]} {table[i, 3]}\n")
 
-                clean_rows.sort()
+            print(f"Wrote {len(order)} {self.elem} lines to {cleaned_filename}")
 
-            cleaned_filename = filename.replace(".txt", "") + "_cleaned.txt"
+    @staticmethod
+    def _filter_sort(wave, code, energy, loggf, prefix):
+        """
+        Select rows whose atomic/molecular number starts with `prefix` and order them by wavelength.
 
-            with open(os.path.join(self.outlines_sorted_dir, cleaned_filename), "w") as f:
-                for col1, col2, col3, col4 in clean_rows:
-                    f.write(f"{col1} {col2} {col3} {col4}\n")
+        Parameters
+        ----------
+        wave, code : np.ndarray
+            Wavelength and atomic/molecular number columns as floats.
+        energy, loggf : np.ndarray
+            Energy and log(gf) columns as strings, used to break ties.
+        prefix : float
+            Atomic/molecular number of the target species (e.g., 106.0).
+
+        Returns
+        -------
+        np.ndarray
+            Indices of the matching rows, sorted by (wavelength, number, energy, log(gf)).
+        """
+        # A code "starts with" e.g. 106.0 when it lies in [106.0, 106.1)
+        decimals = len(str(prefix).partition(".")[2])
+        mask = (code >= prefix) & (code < prefix + 10.0 ** -decimals)
 
-            print(f"Wrote cleaned and sorted line list to {cleaned_filename}")
+        idx = np.flatnonzero(mask)
+        return idx[np.lexsort((loggf[idx], energy[idx], code[idx], wave[idx]))]
 
     def combine(self):
         """
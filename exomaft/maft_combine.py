@@ -1,7 +1,60 @@
 import os
+from pathlib import Path
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import pyarrow as pa
+import pyarrow.csv as pac
+
+if __package__:
+    from . import _plotting
+else:  # Imported from inside the exomaft/ directory
+    import _plotting
+
+
+def _read_ws(path, names):
+    """
+    Read a whitespace-delimited, '#'-commented text table with the pandas C parser.
+
+    Parameters
+    ----------
+    path : str
+        Path to the text file.
+    names : list of str
+        Column names to assign, in file order.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Parsed table with one float64 column per entry in `names`.
+    """
+    # Pin every column to float64 so no type inference pass is needed
+    return pd.read_csv(path, sep=r'\s+', comment='#', header=None, names=names, dtype=np.float64)
+
+
+def _add_error_bars(ax, x, y, xerr, yerr, color):
+    """
+    Draw x and y error bars for a series as a single LineCollection.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to draw on.
+    x, y : array-like
+        Data point coordinates.
+    xerr, yerr : array-like
+        Symmetric 1-sigma errors in x and y.
+    color : str
+        Color of the error bars.
+    """
+    x, y, xerr, yerr = (np.asarray(v, dtype=np.float64) for v in (x, y, xerr, yerr))
+    ysegs = np.stack([np.column_stack([x, y - yerr]), np.column_stack([x, y + yerr])], axis=1)
+    xsegs = np.stack([np.column_stack([x - xerr, y]), np.column_stack([x + xerr, y])], axis=1)
+    ax.add_collection(LineCollection(np.concatenate([ysegs, xsegs]), colors=color, linewidths=1,
+                                     rasterized=True))
+    ax.autoscale_view()
+
 
 class TransmissionSpectrumProcessor:
     """
@@ -27,8 +80,8 @@ class TransmissionSpectrumProcessor:
         self.output_dir = output_dir
         self.plots_dir = plots_dir
 
-        os.makedirs(self.output_dir, exist_ok=True)
-        os.makedirs(self.plots_dir, exist_ok=True)
+        for d in (self.output_dir, self.plots_dir):
+            Path(d).mkdir(parents=True, exist_ok=True)
 
         # DataFrames will be loaded later
         self.df_niriss = None
@@ -42,42 +95,32 @@ class TransmissionSpectrumProcessor:
         Load the spectrum data files for all instruments and convert units where necessary.
         """
         # Load NIRISS spectrum and convert ppm to fractional depth
-        self.df_niriss = pd.read_csv(
+        self.df_niriss = _read_ws(
             self.file_niriss,
-            delim_whitespace=True,
-            comment='#',
-            header=None,
             names=['wavelength','wavelength_err','depth_ppm','depth_err_ppm']
         )
-        self.df_niriss['depth'] = self.df_niriss['depth_ppm'] / 1e6
-        self.df_niriss['depth_err'] = self.df_niriss['depth_err_ppm'] / 1e6
+        arr = self.df_niriss[['depth_ppm','depth_err_ppm']].to_numpy(dtype=np.float64, copy=True)
+        np.multiply(arr, 1e-6, out=arr)
+        self.df_niriss[['depth','depth_err']] = arr
+        self.df_niriss.drop(columns=['depth_ppm','depth_err_ppm'], inplace=True)
 
         # Load Combined Model spectrum without errors
-        self.df_comb = pd.read_csv(
+        self.df_comb = _read_ws(
             self.file_comb,
-            delim_whitespace=True,
-            comment='#',
-            header=None,
             names=['wavelength','depth']
         )
         self.df_comb['wavelength_err'] = 0.0
         self.df_comb['depth_err'] = 0.0
 
         # Load archival HST and Spitzer data (include only necessary columns)
-        self.df_arch = pd.read_csv(
+        self.df_arch = _read_ws(
             self.file_arch,
-            delim_whitespace=True,
-            comment='#',
-            header=None,
             names=['wavelength','wavelength_err','depth','depth_err','ntransits']
         )[['wavelength','wavelength_err','depth','depth_err']]
 
         # Load NIRSpec PRISM data
-        self.df_prism = pd.read_csv(
+        self.df_prism = _read_ws(
             self.file_prism,
-            delim_whitespace=True,
-            comment='#',
-            header=None,
             names=['wavelength','depth','depth_err']
         )
         self.df_prism['wavelength_err'] = 0.0
@@ -87,34 +130,47 @@ class TransmissionSpectrumProcessor:
         Align the baseline (median) of all datasets to match the NIRISS spectrum.
         This is useful for visually consistent overlay plots.
         """
-        base_med = self.df_niriss['depth'].median()
+        # nanmedian keeps the NaN-skipping behaviour of Series.median
+        base_med = np.nanmedian(self.df_niriss['depth'].to_numpy())
         for df in (self.df_comb, self.df_arch, self.df_prism):
-            df['depth'] += (base_med - df['depth'].median())
+            depth = df['depth'].to_numpy()
+            df['depth'] = depth + (base_med - np.nanmedian(depth))
 
     def merge_spectra(self):
         """
         Merge all spectra into a single DataFrame and export it as a tab-separated file.
         """
-        blocks = []
-        for df in (self.df_niriss, self.df_arch, self.df_prism, self.df_comb):
-            tmp = df[['wavelength','depth']].copy()
-            tmp['depth_err'] = df.get('depth_err', np.nan)  # Fill missing error as NaN
-            blocks.append(tmp)
+        frames = (self.df_niriss, self.df_arch, self.df_prism, self.df_comb)
+        W = np.concatenate([df['wavelength'].to_numpy() for df in frames])
+        D = np.concatenate([df['depth'].to_numpy() for df in frames])
+        # Fill missing error as NaN
+        E = np.concatenate([
+            df['depth_err'].to_numpy() if 'depth_err' in df else np.full(len(df), np.nan)
+            for df in frames
+        ])
 
-        # Concatenate all data blocks and remove duplicate wavelength entries
-        self.combined = pd.concat(blocks, ignore_index=True)
-        self.combined = self.combined.sort_values('wavelength')
-        self.combined = self.combined.drop_duplicates(subset='wavelength', keep='first')
+        # Sort by wavelength and keep the first entry (in the order above) of each duplicate
+        order = np.argsort(W, kind='stable')
+        Ws = W[order]
+        keep = np.ones(len(Ws), dtype=bool)
+        keep[1:] = Ws[1:] != Ws[:-1]
+        self.combined = pd.DataFrame({
+            'wavelength': Ws[keep],
+            'depth': D[order][keep],
+            'depth_err': E[order][keep],
+        })
 
         out_file = os.path.join(self.output_dir, 'combined_spectrum.txt')
-        self.combined.to_csv(
-            out_file,
-            sep='\t',
-            index=False,
-            header=['wavelength','depth','depth_err'],
-            float_format='%.6e',
-            na_rep=''
-        )
+        # Pre-format as %.6e strings (NaN -> null -> empty field) and let Arrow write them out
+        table = pa.table({
+            col: pa.array(np.char.mod('%.6e', self.combined[col].to_numpy()),
+                          mask=self.combined[col].isna().to_numpy())
+            for col in ('wavelength','depth','depth_err')
+        })
+        with open(out_file, 'wb') as f:
+            f.write(b'wavelength\tdepth\tdepth_err\n')  # Arrow would quote header names
+            pac.write_csv(table, f, write_options=pac.WriteOptions(
+                include_header=False, delimiter='\t', quoting_style='none'))
         print(f"✅ Combined spectrum written to {out_file}")
 
     def plot_overlay_with_errors(self):
@@ -122,33 +178,24 @@ class TransmissionSpectrumProcessor:
         Plot all spectra overlaid with 1-sigma error bars and save the figure.
         """
         plt.figure(figsize=(8,5))
-        plt.errorbar(
-            self.df_niriss['wavelength'], self.df_niriss['depth'],
-            xerr=self.df_niriss['wavelength_err'], yerr=self.df_niriss['depth_err'],
-            fmt='o-', label='NIRISS SOSS', color='C0', capsize=2
-        )
-        plt.errorbar(
-            self.df_comb['wavelength'], self.df_comb['depth'],
-            xerr=self.df_comb['wavelength_err'], yerr=self.df_comb['depth_err'],
-            fmt='s--', label='Combined Model', color='C1', capsize=2
-        )
-        plt.errorbar(
-            self.df_arch['wavelength'], self.df_arch['depth'],
-            xerr=self.df_arch['wavelength_err'], yerr=self.df_arch['depth_err'],
-            fmt='^:', label='Archival HST/Spitzer', color='C2', capsize=2
-        )
-        plt.errorbar(
-            self.df_prism['wavelength'], self.df_prism['depth'],
-            xerr=self.df_prism['wavelength_err'], yerr=self.df_prism['depth_err'],
-            fmt='D-.', label='NIRSpec PRISM', color='C3', capsize=2
+        ax = plt.gca()
+        series = (
+            (self.df_niriss, 'o-', 'NIRISS SOSS', 'C0'),
+            (self.df_comb, 's--', 'Combined Model', 'C1'),
+            (self.df_arch, '^:', 'Archival HST/Spitzer', 'C2'),
+            (self.df_prism, 'D-.', 'NIRSpec PRISM', 'C3'),
         )
+        for df, fmt, label, color in series:
+            ax.plot(df['wavelength'], df['depth'], fmt, label=label, color=color)
+            _add_error_bars(ax, df['wavelength'], df['depth'],
+                            df['wavelength_err'], df['depth_err'], color)
         plt.xlabel('Wavelength (μm)')
         plt.ylabel('Transit Depth $(Rp/Rs)^2$')
         plt.title('Overlay of Spectra with $1\sigma$ Error Bars')
         plt.legend(loc='best', fontsize='small')
         plt.grid(alpha=0.3)
         plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, 'overlay_spectra_with_errors.png'), dpi=200)
+        plt.savefig(os.path.join(self.plots_dir, 'overlay_spectra_with_errors.png'), dpi=_plotting.savefig_dpi())
         plt.close()
         print(f"✅ Saved plot with errors to {os.path.join(self.plots_dir, 'overlay_spectra_with_errors.png')}")
 
@@ -167,7 +214,7 @@ class TransmissionSpectrumProcessor:
         plt.legend(loc='best', fontsize='small')
         plt.grid(alpha=0.3)
         plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, 'overlay_spectra_no_errors.png'), dpi=200)
+        plt.savefig(os.path.join(self.plots_dir, 'overlay_spectra_no_errors.png'), dpi=_plotting.savefig_dpi())
         plt.close()
         print(f"✅ Saved plot without errors to {os.path.join(self.plots_dir, 'overlay_spectra_no_errors.png')}")
 
@@ -180,9 +227,15 @@ class TransmissionSpectrumProcessor:
         no_err = self.combined[self.combined['depth_err'].isna()]
 
         if not with_err.empty:
-            plt.errorbar(
-                with_err['wavelength'], with_err['depth'], yerr=with_err['depth_err'],
-                fmt='o', label='With error bars', color='black', capsize=2
+            plt.fill_between(
+                with_err['wavelength'],
+                with_err['depth'] - with_err['depth_err'],
+                with_err['depth'] + with_err['depth_err'],
+                color='black', alpha=0.2, label=r'$\pm1\sigma$ uncertainty'
+            )
+            plt.plot(
+                with_err['wavelength'], with_err['depth'], 'o',
+                label='With uncertainties', color='black'
             )
         if not no_err.empty:
             plt.plot(
@@ -195,7 +248,7 @@ class TransmissionSpectrumProcessor:
         plt.legend(loc='best', fontsize='small')
         plt.grid(alpha=0.3)
         plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, 'combined_spectrum.png'), dpi=200)
+        plt.savefig(os.path.join(self.plots_dir, 'combined_spectrum.png'), dpi=_plotting.savefig_dpi())
         plt.close()
         print(f"✅ Saved combined spectrum plot to {os.path.join(self.plots_dir, 'combined_spectrum.png')}")
 
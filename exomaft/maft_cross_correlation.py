@@ -15,9 +15,15 @@ Outputs:
 import os
 import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 from scipy.signal import correlate
 
+if __package__:
+    from . import _hitran, _plotting
+else:  # Run as a script; the script's own directory is on sys.path
+    import _hitran, _plotting
+
 
 class CrossCorrelator:
     """
@@ -115,19 +121,11 @@ class CrossCorrelator:
         Returns
         -------
         pandas.DataFrame
-            DataFrame with molecular line parameters including wavelength_um column.
+            DataFrame with molec_id, nu, sw and wavelength_um columns.
         """
-        colspecs = [(0, 2), (2, 3), (3, 15), (15, 25), (25, 35), (35, 40),
-                    (40, 45), (45, 55), (55, 59), (59, 67)]
-        names = ['molec_id', 'local_iso_id', 'nu', 'sw', 'a', 'gamma_air',
-                 'gamma_self', 'elower', 'n_air', 'delta_air']
-        df = pd.read_fwf(self.par_file, colspecs=colspecs, names=names,
-                         comment='#', skip_blank_lines=True)
+        df = _hitran.load_linelist_par(self.par_file)
         # Correct data types
-        df['molec_id'] = df['molec_id'].astype(int)
-        df['local_iso_id'] = df['local_iso_id'].astype(int)
-        for col in ['nu', 'sw', 'a', 'gamma_air', 'gamma_self', 'elower', 'n_air', 'delta_air']:
-            df[col] = df[col].astype(float)
+        df = df.astype({'molec_id': 'int32', 'nu': 'float64', 'sw': 'float64'})
         # Convert wavenumber to wavelength in microns
         df['wavelength_um'] = 1e4 / df['nu']
         return df
@@ -147,8 +145,55 @@ class CrossCorrelator:
         np.ndarray
             Z-scored array.
         """
-        std = np.std(arr)
-        return (arr - np.mean(arr)) / (std if std > 0 else 1.0)
+        # Center once and reuse it for both the standard deviation and the result
+        centered = arr - np.mean(arr)
+        std = np.sqrt(np.mean(centered * centered))
+        return centered / (std if std > 0 else 1.0)
+
+    @staticmethod
+    def sparse_correlate(data, template, spikes):
+        """
+        Compute ``correlate(data, template, mode='same')`` for a template that is constant
+        everywhere except at a few spike indices.
+
+        The constant part reduces to a sliding-window sum of `data` (via a cumulative sum),
+        and each spike adds one shifted copy of `data`, so the cost is O(N * len(spikes))
+        without an FFT. Dense templates fall back to `scipy.signal.correlate`.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            Input signal of length N.
+        template : np.ndarray
+            Template of length N.
+        spikes : np.ndarray
+            Indices where `template` differs from its constant baseline.
+
+        Returns
+        -------
+        np.ndarray
+            Correlation of length N, centered as in ``mode='same'``.
+        """
+        n = len(data)
+        if len(spikes) > np.sqrt(n):
+            return correlate(data, template, mode='same')
+
+        shift0 = n // 2
+        n_base = n - len(spikes)
+        baseline = (template.sum() - template[spikes].sum()) / n_base if n_base else 0.0
+
+        # Constant baseline: sum of the data samples overlapping the template at each lag
+        csum = np.concatenate(([0.0], np.cumsum(data)))
+        lags = np.arange(n) - shift0
+        ccf = baseline * (csum[np.minimum(n, n + lags)] - csum[np.maximum(0, lags)])
+
+        # Spikes: one shifted, weighted copy of the data each
+        for s in spikes:
+            lo = max(0, shift0 - s)
+            hi = min(n, n + shift0 - s)
+            off = s - shift0
+            ccf[lo:hi] += (template[s] - baseline) * data[lo + off:hi + off]
+        return ccf
 
     def run_cross_correlation(self):
         """
@@ -157,33 +202,39 @@ class CrossCorrelator:
         """
         wave, depth = self.load_combined_spectrum()
         lines = self.load_linelist_par()
+        by_mid = _hitran.group_by_molecule(lines)
+
+        # searchsorted needs an ascending grid; sort a view once and map hits back through `order`
+        order = np.argsort(wave, kind='stable')
+        wave_sorted = wave[order]
+
+        # The spectrum is the same for every molecule, so z-score it once
+        d0 = self.zscore(depth)
 
         ccf_peaks = []
         plt.figure(figsize=(10, 4))
 
         for name, mol_id in self.molecules.items():
-            dfm = lines[lines['molec_id'] == mol_id]
-            if dfm.empty:
+            dfm = by_mid.get(mol_id)
+            if dfm is None:
                 continue
 
-            # Select strongest lines for clustering
-            strongest = dfm.nlargest(self.top_n, 'sw')['wavelength_um'].values
-            bins = np.arange(wave.min(), wave.max() + self.bin_width, self.bin_width)
-            inds = np.digitize(strongest, bins)
-            centers = np.array([strongest[inds == b].mean() for b in np.unique(inds)])
+            # Cluster the strongest lines into template centers
+            centers = _hitran.cluster_centers(dfm['wavelength_um'].to_numpy(), dfm['sw'].to_numpy(),
+                                             wave, self.top_n, self.bin_width)
 
-            # Create template vector with spikes at cluster centers
+            # Create template vector with spikes at the grid points nearest the cluster
+            # centers, using a binary search instead of a scan per center
+            idx = np.clip(np.searchsorted(wave_sorted, centers), 1, len(wave) - 1)
+            left = idx - 1
+            choose_left = np.abs(wave_sorted[left] - centers) <= np.abs(wave_sorted[idx] - centers)
             tpl = np.zeros_like(depth)
-            for lam in centers:
-                i = np.argmin(np.abs(wave - lam))
-                tpl[i] = 1.0
+            tpl[order[np.where(choose_left, left, idx)]] = 1.0
 
-            # Compute z-scores
-            d0 = self.zscore(depth)
             tpl0 = self.zscore(tpl)
 
-            # Full-mode correlation
-            ccf = correlate(d0, tpl0, mode='same')
+            # Same-mode correlation, exploiting that the template is a sparse spike train
+            ccf = self.sparse_correlate(d0, tpl0, np.flatnonzero(tpl))
             peak = np.max(ccf)
             ccf_peaks.append((name, peak))
 
@@ -191,7 +242,8 @@ class CrossCorrelator:
             plt.plot(wave, ccf, label=f"{name} (peak {peak:.1f})", linewidth=1)
 
         # Save peak values
-        df_peaks = pd.DataFrame(ccf_peaks, columns=['molecule', 'ccf_peak'])
+        df_peaks = pd.DataFrame(ccf_peaks, columns=['molecule', 'ccf_peak']).astype(
+            {'molecule': 'string[pyarrow]', 'ccf_peak': 'float64'})
         df_peaks.to_csv(self.out_peaks, sep='\t', index=False, float_format='%.3f')
 
         # Finalize plot
@@ -201,10 +253,12 @@ class CrossCorrelator:
         plt.legend(loc='upper right', fontsize='small', ncol=2, frameon=False)
         plt.grid(alpha=0.2)
         plt.tight_layout()
-        plt.savefig(self.plot_file, dpi=200)
-        plt.show()
+        plt.savefig(self.plot_file, dpi=_plotting.savefig_dpi())
+        plt.close()
+        print(f"✅ Saved CCF plot to {self.plot_file}")
 
 
 if __name__ == '__main__':
+    matplotlib.use('Agg')
     correlator = CrossCorrelator()
     correlator.run_cross_correlation()
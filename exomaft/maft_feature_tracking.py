@@ -16,7 +16,15 @@ Output:
 import os
 import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+if __package__:
+    from . import _hitran, _plotting
+else:  # Run as a script; the script's own directory is on sys.path
+    import _hitran, _plotting
+
 
 class FeatureTracker:
     """
@@ -82,31 +90,16 @@ class FeatureTracker:
         Returns
         -------
         pandas.DataFrame
-            DataFrame containing molecular lines and converted wavelengths.
+            DataFrame with molec_id, nu, sw and converted wavelength_um columns.
         """
-        colspecs = [
-            (0,2),(2,3),(3,15),(15,25),(25,35),
-            (35,40),(40,45),(45,55),(55,59),(59,67)
-        ]
-        names = [
-            'molec_id','local_iso_id','nu','sw','a',
-            'gamma_air','gamma_self','elower','n_air','delta_air'
-        ]
-        df = pd.read_fwf(
-            self.par_file_path,
-            colspecs=colspecs,
-            names=names,
-            comment='#',
-            skip_blank_lines=True
-        )
+        df = _hitran.load_linelist_par(self.par_file_path)
 
-        for c in ('molec_id','local_iso_id'):
-            bad_rows = df[~df[c].astype(str).str.fullmatch(r'\d+')]
-            if not bad_rows.empty:
-                print(f"\nColumn {c} has non-integer values:")
-                print(bad_rows[[c]])
-            else:
-                df[c] = df[c].astype(float)
+        bad_rows = df[~df['molec_id'].astype(str).str.fullmatch(r'\d+')]
+        if not bad_rows.empty:
+            print("\nColumn molec_id has non-integer values:")
+            print(bad_rows[['molec_id']])
+        else:
+            df['molec_id'] = df['molec_id'].astype(float)
 
         df['wavelength_um'] = 1e4 / df['nu']
         return df
@@ -117,6 +110,7 @@ class FeatureTracker:
         """
         spec = self.load_combined_spectrum()
         lines = self.load_linelist_par()
+        by_mid = _hitran.group_by_molecule(lines)
 
         wave = spec['wavelength_um'].values
         depth = spec['depth'].values
@@ -128,29 +122,37 @@ class FeatureTracker:
 
         ymin, ymax = ax.get_ylim()
         out_rows = []
+        all_segs = []
+        all_colors = []
         colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
         for idx, (name, mol_id) in enumerate(self.molecules.items()):
-            dfm = lines[lines['molec_id'] == mol_id]
-            if dfm.empty:
+            dfm = by_mid.get(mol_id)
+            if dfm is None:
                 continue
 
-            strongest = dfm.nlargest(self.top_n, 'sw')['wavelength_um'].values
-            bins = np.arange(wave.min(), wave.max() + self.bin_width, self.bin_width)
-            inds = np.digitize(strongest, bins)
-            centers = [strongest[inds == b].mean() for b in np.unique(inds)]
+            centers = _hitran.cluster_centers(dfm['wavelength_um'].to_numpy(), dfm['sw'].to_numpy(),
+                                             wave, self.top_n, self.bin_width)
 
             for lam in centers:
                 out_rows.append((name, lam))
 
-            for lam in centers:
-                ax.vlines(lam, ymin, ymax, color=colors[idx % len(colors)],
-                          linewidth=1, alpha=self.alpha_lines)
+            all_segs.append(np.stack([np.column_stack([centers, np.full_like(centers, ymin)]),
+                                      np.column_stack([centers, np.full_like(centers, ymax)])],
+                                     axis=1))
+            all_colors.extend([colors[idx % len(colors)]] * len(centers))
 
             ax.plot([], [], color=colors[idx % len(colors)], lw=3,
                     alpha=self.alpha_lines, label=name)
 
-        df_out = pd.DataFrame(out_rows, columns=['molecule', 'wavelength_um'])
+        # All feature lines go into a single collection rather than one artist per line
+        if all_segs:
+            ax.add_collection(LineCollection(np.concatenate(all_segs), colors=all_colors,
+                                             linewidths=1, alpha=self.alpha_lines, rasterized=True),
+                              autolim=False)
+
+        df_out = pd.DataFrame(out_rows, columns=['molecule', 'wavelength_um']).astype(
+            {'molecule': 'string[pyarrow]', 'wavelength_um': 'float64'})
         df_out.to_csv(self.out_lines_file, sep='\t', index=False, float_format='%.6f')
 
         ax.set_xlim(wave.min(), wave.max())
@@ -162,10 +164,12 @@ class FeatureTracker:
         ax.grid(alpha=0.2)
 
         plt.tight_layout()
-        plt.savefig(self.plot_file, dpi=200)
-        plt.show()
+        plt.savefig(self.plot_file, dpi=_plotting.savefig_dpi())
+        plt.close()
+        print(f"✅ Saved feature tracking plot to {self.plot_file}")
 
 
 if __name__ == "__main__":
+    matplotlib.use('Agg')
     tracker = FeatureTracker()
     tracker.plot_and_save()